@@ -0,0 +1,195 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+from renko_bricks import brick_closes
+from renko_indicators import compute_indicator, rows_input
+from shared_dataset_store import load_shared_dataset
+from symbol_datasets import discover_files
+
+# Vectorized signal and backtest engine over Renko bricks.
+#
+# A rule turns brick closes (and optionally an indicator) into a target
+# position of +1 (long), -1 (short) or 0 (flat) for every brick. Positions
+# are taken on the brick after the signal, and each position change pays
+# the slippage. Everything is computed with whole-array NumPy operations, so
+# a parameter grid can be evaluated without per-brick Python loops.
+
+DATA_DIRECTORY = r'./data/custom-format/renko-parsed'
+BRICK_SIZE = 10
+TOP_RESULTS = 20
+
+# Indicators the ma_cross rule can be tested against: (indicator, params), computed from the data rows
+BACKTEST_INDICATORS = [
+    ('sma', {'window': 5}),
+    ('median', {'window': 5}),
+    ('ema', {'span': 20}),
+    ('vwap', {}),
+    ('bollinger', {'window': 20, 'num_std': 2}),
+]
+
+def indicator_label(name, params):
+    # Key of an indicator in the datasets and the parameter grid, e.g. 'sma(window=5)'
+    return f"{name}({', '.join(f'{key}={value}' for key, value in sorted(params.items()))})"
+
+def brick_indicator(bricks, row_values):
+    # Map an indicator computed per data row onto the bricks drawn for that row
+    return np.asarray(row_values, dtype=np.float64)[bricks['brick_row']]
+
+def _hold_last_signal(signals):
+    # Forward fill the non-zero signals, positions are 0 until the first signal
+    index = np.where(signals != 0, np.arange(len(signals)), 0)
+    np.maximum.accumulate(index, out=index)
+    positions = signals[index]
+    if len(signals) and signals[0] == 0:
+        positions[index == 0] = 0
+    return positions
+
+def reversal_positions(closes, bricks_to_reverse):
+    # Go with the new direction once it has printed N consecutive bricks
+    directions = np.sign(np.diff(closes, prepend=closes[0] if len(closes) else 0))
+    directions[0] = 0
+    changes = np.flatnonzero(np.diff(directions, prepend=0) != 0)
+    run_starts = np.zeros(len(closes), dtype=np.int64)
+    run_starts[changes] = changes
+    np.maximum.accumulate(run_starts, out=run_starts)
+    run_lengths = np.arange(len(closes)) - run_starts + 1
+    signals = np.where(run_lengths == bricks_to_reverse, directions, 0).astype(np.int64)
+    return _hold_last_signal(signals)
+
+def ma_cross_positions(closes, indicator, threshold=0):
+    # Long above the indicator, short below it; inside the threshold band keep the last side
+    distance = closes - indicator
+    valid = np.isfinite(indicator) & (indicator > 0)  # NaN (or 0 in the parsed CSVs) before the first full window
+    signals = np.where(valid & (distance > threshold), 1, np.where(valid & (distance < -threshold), -1, 0))
+    return _hold_last_signal(signals.astype(np.int64))
+
+def backtest(closes, positions, slippage=0, allow_short=True):
+    closes = np.asarray(closes, dtype=np.float64)
+    if not allow_short:
+        positions = np.maximum(positions, 0)
+
+    # Trade on the next brick so a signal never uses its own close
+    held = np.concatenate(([0], positions[:-1])) if len(positions) else positions
+    turnover = np.abs(np.diff(held, prepend=0))
+    price_changes = np.diff(closes, prepend=closes[0] if len(closes) else 0)
+    pnl = held * price_changes - slippage * turnover
+    equity = np.cumsum(pnl)
+
+    # Per-trade P&L: a new trade starts whenever the held position changes to a non-zero side.
+    # On a position change the exit slippage belongs to the trade being closed and the entry
+    # slippage to the one being opened, so the trades add up to the final equity
+    trade_ids = np.cumsum((turnover != 0) & (held != 0))
+    held_before = np.concatenate(([0], held[:-1])) if len(held) else held
+    trade_ids_before = np.concatenate(([0], trade_ids[:-1])) if len(trade_ids) else trade_ids
+    changed = held != held_before
+    entry_pnl = held * price_changes - slippage * np.abs(held) * changed
+    exit_costs = slippage * np.abs(held_before) * changed
+    trades = int(trade_ids[-1]) + 1 if len(trade_ids) else 1
+    trade_pnl = (
+        np.bincount(trade_ids, weights=np.where(held != 0, entry_pnl, 0), minlength=trades)
+        - np.bincount(trade_ids_before, weights=exit_costs, minlength=trades)
+    )[1:]
+
+    return {
+        'held': held,
+        'pnl': pnl,
+        'equity': equity,
+        'trade_pnl': trade_pnl,
+    }
+
+def summarize(result):
+    equity = result['equity']
+    trade_pnl = result['trade_pnl']
+    drawdown = np.maximum.accumulate(np.concatenate(([0], equity)))[1:] - equity if len(equity) else equity
+    return {
+        'total_pnl': float(equity[-1]) if len(equity) else 0.0,
+        'trades': int(len(trade_pnl)),
+        'win_rate': float(np.mean(trade_pnl > 0)) if len(trade_pnl) else 0.0,
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+    }
+
+def evaluate(dataset, params):
+    closes = dataset['closes']
+    if params['rule'] == 'reversal':
+        positions = reversal_positions(closes, params['bricks_to_reverse'])
+    elif params['rule'] == 'ma_cross':
+        positions = ma_cross_positions(closes, dataset['indicators'][params['indicator']], params.get('threshold', 0))
+    else:
+        raise ValueError(f"Unknown rule: {params['rule']}")
+    result = backtest(closes, positions, params.get('slippage', 0), params.get('allow_short', True))
+    return summarize(result)
+
+def parameter_grid(rule, **values):
+    # Every combination of the given parameter values, e.g. parameter_grid('reversal', bricks_to_reverse=range(1, 10))
+    names = list(values)
+    return [dict(rule=rule, **dict(zip(names, combination))) for combination in itertools.product(*values.values())]
+
+# The datasets are sent to each worker once, not with every batch of parameters
+_worker_datasets = None
+
+def _init_worker(datasets):
+    global _worker_datasets
+    _worker_datasets = datasets
+
+def _evaluate_batch(params_batch):
+    rows = []
+    for params in params_batch:
+        summaries = [evaluate(dataset, params) for dataset in _worker_datasets]
+        row = dict(params)
+        row['total_pnl'] = sum(summary['total_pnl'] for summary in summaries)
+        row['trades'] = sum(summary['trades'] for summary in summaries)
+        row['max_drawdown'] = max(summary['max_drawdown'] for summary in summaries)
+        row['profitable_files'] = sum(summary['total_pnl'] > 0 for summary in summaries)
+        rows.append(row)
+    return rows
+
+def run_parameter_grid(datasets, grid, processes=None, batch_size=64):
+    # Evaluate every parameter combination over all datasets and rank by total P&L
+    batches = [grid[start:start + batch_size] for start in range(0, len(grid), batch_size)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(datasets,)) as executor:
+        rows = [row for batch_rows in executor.map(_evaluate_batch, batches) for row in batch_rows]
+    summary = pd.DataFrame(rows)
+    return summary.sort_values(['total_pnl', 'max_drawdown'], ascending=[False, True]).reset_index(drop=True)
+
+def datasets_from_shared(dataset, indicators=BACKTEST_INDICATORS):
+    # The indicators are computed from the data rows with the registry, so any file can be tested against any of them;
+    # for indicators with several outputs (e.g. Bollinger bands) the rule uses the first one
+    datasets = []
+    for index in range(len(dataset)):
+        bricks = dataset.bricks(index)
+        data = rows_input(dataset.frame(index))
+        datasets.append({
+            'name': os.path.basename(dataset.file_paths[index]),
+            'closes': brick_closes(bricks),
+            'indicators': {
+                indicator_label(name, params): brick_indicator(bricks, next(iter(compute_indicator(name, data, **params).values())))
+                for name, params in indicators
+            },
+        })
+    return datasets
+
+######## END OF FUNCTIONS >>>>>>
+
+if __name__ == '__main__':
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_directory)
+
+    slippages = [0, 1, 2.5, 5]
+    grid = (
+        parameter_grid('reversal', bricks_to_reverse=range(1, 21), slippage=slippages, allow_short=[True, False])
+        + parameter_grid('ma_cross', indicator=[indicator_label(name, params) for name, params in BACKTEST_INDICATORS],
+                         threshold=range(0, 50, 5), slippage=slippages, allow_short=[True, False])
+    )
+
+    # Each symbol is ranked on its own files, P&L of different instruments is never pooled
+    for symbol, files in discover_files(DATA_DIRECTORY).items():
+        file_paths = [path for _, path in files]
+        datasets = datasets_from_shared(load_shared_dataset(file_paths, brick_size=BRICK_SIZE, parallel_bricks=True))
+
+        summary = run_parameter_grid(datasets, grid)
+        print(f"{symbol}: Evaluated {len(grid)} parameter combinations over {len(datasets)} files")
+        print(summary.head(TOP_RESULTS).to_string())
@@ -0,0 +1,158 @@
+import os
+import math
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+# Computes the Renko bricks that the viewers draw, as plain NumPy arrays.
+# The stacking rules are the same as the loop in the plot_data functions:
+# a colour change moves the current position by one brick, full bricks are
+# stacked while the difference is at least one brick, and any remainder is
+# drawn as a partial brick ending at the close price.
+
+PARALLEL_MIN_ROWS = 200_000  # Below this the sequential builder is faster
+PARALLEL_MIN_CHUNK_ROWS = 20_000  # Smaller chunks cost more to send to a process than to build
+
+def _build_rows(opens, closes, brick_size, start, stop, current_y_position, prev_row_renko_color):
+    # Bricks of rows start..stop-1 given the state left by the previous row; returns the bricks and the new state
+    rows = []  # Index of the data row each brick belongs to
+    y_starts = []  # Bottom of each brick
+    y_ends = []  # Top of each brick
+    is_up = []  # True for green bricks, False for red ones
+
+    for i in range(start, stop):
+        open_price = opens[i]
+        close_price = closes[i]
+        difference = close_price - open_price
+
+        # Determine the color of the brick
+        color = 'green' if close_price >= open_price else 'red'
+
+        # Adjust current_y_position based on previous color if it changes
+        if prev_row_renko_color is not None and color != prev_row_renko_color:
+            if color == 'green':
+                current_y_position += brick_size
+            elif color == 'red':
+                current_y_position -= brick_size
+
+        while abs(difference) >= brick_size:
+            y_start = current_y_position
+            y_end = y_start + (brick_size if difference > 0 else -brick_size)
+
+            rows.append(i)
+            y_starts.append(min(y_start, y_end))
+            y_ends.append(max(y_start, y_end))
+            is_up.append(color == 'green')
+
+            current_y_position = y_end  # Update the y-position for the next brick
+            difference = close_price - current_y_position
+
+        # Keep the remaining part of the brick, if any
+        if abs(difference) > 0:
+            y_start = current_y_position
+            y_end = close_price
+
+            rows.append(i)
+            y_starts.append(min(y_start, y_end))
+            y_ends.append(max(y_start, y_end))
+            is_up.append(color == 'green')
+
+            current_y_position = y_end  # Update the y-position for the next brick
+
+        prev_row_renko_color = color
+
+    return _to_arrays(rows, y_starts, y_ends, is_up), (current_y_position, prev_row_renko_color)
+
+def build_renko_bricks(opens, closes, brick_size):
+    opens = np.asarray(opens, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(opens) == 0:
+        return _to_arrays([], [], [], [])
+
+    # Start at the first Renko open price
+    bricks, _ = _build_rows(opens, closes, brick_size, 0, len(opens), opens[0], None)
+    return bricks
+
+# Chunk-and-stitch construction for long histories.
+#
+# The state carried from row to row is (current_y_position, previous color).
+# Every row with open != close ends with current_y_position == its close and
+# its own color, whatever state it started from. So inside a chunk, only the
+# rows up to and including the first such row depend on the chunk's starting
+# state. The workers build the rest of their chunk from the state that row
+# leaves behind, and the stitch pass rebuilds just those leading rows once the
+# true ending state of the previous chunk is known. The result is identical
+# to build_renko_bricks.
+
+def _first_sync_row(opens, closes, start, stop):
+    # First row of the chunk that does not open and close at the same price, None if there is none
+    moving = np.flatnonzero(opens[start:stop] != closes[start:stop])
+    return start + int(moving[0]) if len(moving) else None
+
+def _build_chunk(opens, closes, brick_size, start, stop):
+    sync_row = _first_sync_row(opens, closes, start, stop)
+    if sync_row is None:
+        return None, None, None
+    sync_state = (closes[sync_row], 'green' if closes[sync_row] >= opens[sync_row] else 'red')
+    bricks, end_state = _build_rows(opens, closes, brick_size, sync_row + 1, stop, *sync_state)
+    return sync_row, bricks, end_state
+
+def _build_chunk_from_slices(chunk_opens, chunk_closes, brick_size, start):
+    # Worker entry point: only the chunk's own rows are sent to the process, row indexes are made global here
+    sync_row, bricks, end_state = _build_chunk(chunk_opens, chunk_closes, brick_size, 0, len(chunk_opens))
+    if sync_row is None:
+        return None, None, None
+    bricks['brick_row'] += start
+    return sync_row + start, bricks, end_state
+
+def build_renko_bricks_parallel(opens, closes, brick_size, processes=None, chunk_rows=None, executor=None):
+    opens = np.asarray(opens, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(opens) < PARALLEL_MIN_ROWS:
+        return build_renko_bricks(opens, closes, brick_size)
+    if chunk_rows is None:
+        # One chunk per worker, so the build scales with the number of cores; a passed executor is
+        # assumed to have the default size, as the one publish_dataset creates
+        workers = processes or os.cpu_count() or 1
+        chunk_rows = max(math.ceil(len(opens) / workers), PARALLEL_MIN_CHUNK_ROWS)
+    if chunk_rows >= len(opens):
+        return build_renko_bricks(opens, closes, brick_size)
+
+    starts = list(range(0, len(opens), chunk_rows))
+    stops = starts[1:] + [len(opens)]
+    arguments = (
+        [opens[start:stop] for start, stop in zip(starts, stops)],
+        [closes[start:stop] for start, stop in zip(starts, stops)],
+        [brick_size] * len(starts),
+        starts,
+    )
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=processes) as own_executor:
+            chunks = list(own_executor.map(_build_chunk_from_slices, *arguments))
+    else:
+        chunks = list(executor.map(_build_chunk_from_slices, *arguments))
+
+    # Stitch: rebuild each chunk's leading rows from the true state, then append the worker's bricks
+    pieces = []
+    state = (opens[0], None)
+    for start, stop, (sync_row, bricks, end_state) in zip(starts, stops, chunks):
+        leading_stop = stop if sync_row is None else sync_row + 1
+        leading_bricks, state = _build_rows(opens, closes, brick_size, start, leading_stop, *state)
+        pieces.append(leading_bricks)
+        if sync_row is not None:
+            pieces.append(bricks)
+            state = end_state
+
+    return {name: np.concatenate([piece[name] for piece in pieces]) for name in pieces[0]}
+
+def _to_arrays(rows, y_starts, y_ends, is_up):
+    return {
+        'brick_row': np.asarray(rows, dtype=np.int64),
+        'brick_y_start': np.asarray(y_starts, dtype=np.float64),
+        'brick_y_end': np.asarray(y_ends, dtype=np.float64),
+        'brick_is_up': np.asarray(is_up, dtype=bool),
+    }
+
+def brick_closes(bricks):
+    # Close of each brick: the top of a green brick, the bottom of a red one
+    return np.where(bricks['brick_is_up'], bricks['brick_y_end'], bricks['brick_y_start'])
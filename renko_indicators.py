@@ -0,0 +1,263 @@
+import bisect
+import numpy as np
+
+from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+from renko_bricks import brick_closes
+
+# Indicator registry for the chart overlays.
+#
+# Every indicator is one class holding its parameters, with two ways to run it:
+#   batch(data)  -> computes the whole series at once with NumPy
+#   update(bar)  -> feeds one new bar and returns the latest values in O(1)
+# `data` is a dict of arrays with the keys 'open', 'high', 'low', 'close' and
+# 'volume'; `bar` is the same dict with one scalar per key. Both return a dict
+# of outputs, and values are NaN until the indicator has enough bars.
+
+INDICATORS = {}
+
+def register(name):
+    def decorator(indicator_class):
+        INDICATORS[name] = indicator_class
+        return indicator_class
+    return decorator
+
+def create_indicator(name, **params):
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {name}")
+    return INDICATORS[name](**params)
+
+def compute_indicator(name, data, **params):
+    return create_indicator(name, **params).batch(data)
+
+def _rolling(values, window):
+    # Sliding windows over the values, padded with NaN so the output lines up with the input
+    values = np.asarray(values, dtype=np.float64)
+    windows = sliding_window_view(values, window) if len(values) >= window else np.empty((0, window))
+    return windows, np.full(min(window - 1, len(values)), np.nan)
+
+@register('sma')
+class SMA:
+    def __init__(self, window=5):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def batch(self, data):
+        windows, padding = _rolling(data['close'], self.window)
+        return {'sma': np.concatenate((padding, windows.mean(axis=1)))}
+
+    def update(self, bar):
+        self.values.append(bar['close'])
+        self.total += bar['close']
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        return {'sma': self.total / self.window if len(self.values) == self.window else np.nan}
+
+@register('ema')
+class EMA:
+    def __init__(self, span=20):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.value = None
+
+    def batch(self, data):
+        closes = np.asarray(data['close'], dtype=np.float64)
+        if len(closes) == 0:
+            return {'ema': closes}
+        # y[i] = alpha * x[i] + (1 - alpha) * y[i - 1], seeded with the first close
+        ema, _ = lfilter([self.alpha], [1, self.alpha - 1], closes, zi=[(1 - self.alpha) * closes[0]])
+        return {'ema': ema}
+
+    def update(self, bar):
+        if self.value is None:
+            self.value = bar['close']
+        else:
+            self.value = self.alpha * bar['close'] + (1 - self.alpha) * self.value
+        return {'ema': self.value}
+
+@register('median')
+class RollingMedian:
+    # The streaming update keeps the window sorted, so it costs O(window) rather than O(1)
+    def __init__(self, window=5):
+        self.window = window
+        self.values = deque()
+        self.sorted_values = []
+
+    def batch(self, data):
+        windows, padding = _rolling(data['close'], self.window)
+        return {'median': np.concatenate((padding, np.median(windows, axis=1)))}
+
+    def update(self, bar):
+        self.values.append(bar['close'])
+        bisect.insort(self.sorted_values, bar['close'])
+        if len(self.values) > self.window:
+            del self.sorted_values[bisect.bisect_left(self.sorted_values, self.values.popleft())]
+        if len(self.values) < self.window:
+            return {'median': np.nan}
+        middle = self.window // 2
+        if self.window % 2:
+            return {'median': self.sorted_values[middle]}
+        return {'median': (self.sorted_values[middle - 1] + self.sorted_values[middle]) / 2}
+
+@register('vwap')
+class VWAP:
+    # Volume weighted typical price, cumulative when window is None
+    def __init__(self, window=None):
+        self.window = window
+        self.values = deque()
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def batch(self, data):
+        typical_price = (np.asarray(data['high']) + np.asarray(data['low']) + np.asarray(data['close'])) / 3
+        volume = np.asarray(data['volume'], dtype=np.float64)
+        if self.window is None:
+            price_volume = np.cumsum(typical_price * volume)
+            total_volume = np.cumsum(volume)
+        else:
+            windows, padding = _rolling(typical_price * volume, self.window)
+            price_volume = np.concatenate((padding, windows.sum(axis=1)))
+            windows, padding = _rolling(volume, self.window)
+            total_volume = np.concatenate((padding, windows.sum(axis=1)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {'vwap': price_volume / total_volume}
+
+    def update(self, bar):
+        price_volume = (bar['high'] + bar['low'] + bar['close']) / 3 * bar['volume']
+        self.price_volume += price_volume
+        self.volume += bar['volume']
+        if self.window is not None:
+            self.values.append((price_volume, bar['volume']))
+            if len(self.values) > self.window:
+                old_price_volume, old_volume = self.values.popleft()
+                self.price_volume -= old_price_volume
+                self.volume -= old_volume
+            if len(self.values) < self.window:
+                return {'vwap': np.nan}
+        return {'vwap': self.price_volume / self.volume if self.volume else np.nan}
+
+@register('atr')
+class ATR:
+    # Average true range with Wilder's smoothing, seeded with the mean of the first `window` ranges
+    def __init__(self, window=14):
+        self.window = window
+        self.previous_close = None
+        self.seed_total = 0.0
+        self.count = 0
+        self.value = np.nan
+
+    def batch(self, data):
+        highs = np.asarray(data['high'], dtype=np.float64)
+        lows = np.asarray(data['low'], dtype=np.float64)
+        closes = np.asarray(data['close'], dtype=np.float64)
+        previous_closes = np.concatenate(([np.nan], closes[:-1]))
+        true_range = np.fmax(highs - lows, np.fmax(np.abs(highs - previous_closes), np.abs(lows - previous_closes)))
+
+        atr = np.full(len(closes), np.nan)
+        if len(closes) >= self.window:
+            seed = true_range[:self.window].mean()
+            alpha = 1 / self.window
+            atr[self.window - 1] = seed
+            atr[self.window:], _ = lfilter([alpha], [1, alpha - 1], true_range[self.window:], zi=[(1 - alpha) * seed])
+        return {'atr': atr}
+
+    def update(self, bar):
+        true_range = bar['high'] - bar['low']
+        if self.previous_close is not None:
+            true_range = max(true_range, abs(bar['high'] - self.previous_close), abs(bar['low'] - self.previous_close))
+        self.previous_close = bar['close']
+        self.count += 1
+        if self.count < self.window:
+            self.seed_total += true_range
+        elif self.count == self.window:
+            self.value = (self.seed_total + true_range) / self.window
+        else:
+            self.value += (true_range - self.value) / self.window
+        return {'atr': self.value}
+
+@register('bollinger')
+class BollingerBands:
+    def __init__(self, window=20, num_std=2):
+        self.window = window
+        self.num_std = num_std
+        self.values = deque()
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def batch(self, data):
+        windows, padding = _rolling(data['close'], self.window)
+        middle = np.concatenate((padding, windows.mean(axis=1)))
+        deviation = np.concatenate((padding, windows.std(axis=1)))
+        return {
+            'bollinger_middle': middle,
+            'bollinger_upper': middle + self.num_std * deviation,
+            'bollinger_lower': middle - self.num_std * deviation,
+        }
+
+    def update(self, bar):
+        self.values.append(bar['close'])
+        self.total += bar['close']
+        self.total_squares += bar['close'] ** 2
+        if len(self.values) > self.window:
+            old_value = self.values.popleft()
+            self.total -= old_value
+            self.total_squares -= old_value ** 2
+        if len(self.values) < self.window:
+            return {'bollinger_middle': np.nan, 'bollinger_upper': np.nan, 'bollinger_lower': np.nan}
+        middle = self.total / self.window
+        deviation = np.sqrt(max(self.total_squares / self.window - middle ** 2, 0.0))
+        return {
+            'bollinger_middle': middle,
+            'bollinger_upper': middle + self.num_std * deviation,
+            'bollinger_lower': middle - self.num_std * deviation,
+        }
+
+def rows_input(df):
+    # Indicator input from the Renko rows of a data file
+    opens = df['Renko_Open'].to_numpy(dtype=np.float64)
+    closes = df['Renko_Close'].to_numpy(dtype=np.float64)
+    volume_column = 'Volume' if 'Volume' in df else 'Volume_Total'
+    return {
+        'open': opens,
+        'high': np.maximum(opens, closes),
+        'low': np.minimum(opens, closes),
+        'close': closes,
+        'volume': df[volume_column].to_numpy(dtype=np.float64) if volume_column in df else np.zeros(len(df)),
+    }
+
+def bricks_input(bricks, row_volume=None):
+    # Indicator input from the bricks, with each row's volume split evenly over its bricks
+    closes = brick_closes(bricks)
+    opens = np.where(bricks['brick_is_up'], bricks['brick_y_start'], bricks['brick_y_end'])
+    volume = np.zeros(len(closes))
+    if row_volume is not None and len(closes):
+        bricks_per_row = np.bincount(bricks['brick_row'])
+        volume = np.asarray(row_volume, dtype=np.float64)[bricks['brick_row']] / bricks_per_row[bricks['brick_row']]
+    return {
+        'open': opens,
+        'high': np.asarray(bricks['brick_y_end']),
+        'low': np.asarray(bricks['brick_y_start']),
+        'close': closes,
+        'volume': volume,
+    }
+
+class IndicatorCache:
+    # Results keyed by (file, brick size, indicator, params), so toggling an overlay never recomputes it.
+    # `version` invalidates the entries of a file when its data changes (e.g. SharedDataset.version).
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, file_path, brick_size, name, data, version=None, **params):
+        key = (file_path, brick_size, name, tuple(sorted(params.items())))
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version:
+            # `data` may be a callable so the inputs are only built on a cache miss
+            entry = (version, compute_indicator(name, data() if callable(data) else data, **params))
+            self.entries[key] = entry
+        return entry[1]
+
+    def clear(self):
+        self.entries.clear()
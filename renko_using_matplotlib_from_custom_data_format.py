@@ -1,14 +1,33 @@
 import os
 import re
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from matplotlib.widgets import Button
+from matplotlib.widgets import Button, CheckButtons
 # NEW: Lib added >> Start
 from matplotlib.patches import Rectangle
 # NEW: Lib added >> End
+from renko_bricks import build_renko_bricks
+from renko_indicators import IndicatorCache, rows_input
+from volume_profile import renko_volume_profile, window_profile, level_colors
+
+BRICK_SIZE = 10  # Define the brick size
+
+# Overlays that can be toggled on the chart: label -> (indicator, params, color)
+OVERLAYS = {
+    'Moving Average': ('sma', {'window': 5}, 'blue'),
+    'Median': ('median', {'window': 5}, 'orange'),
+    'EMA': ('ema', {'span': 20}, 'purple'),
+    'VWAP': ('vwap', {}, 'brown'),
+    'Bollinger': ('bollinger', {'window': 20, 'num_std': 2}, 'gray'),
+}
+DEFAULT_OVERLAYS = ['Moving Average', 'Median']
+
 dataframes = []
 current_index = 0
+indicator_cache = IndicatorCache()
+volume_profiles = {}  # File path -> (row times, volume profile index)
 
 def change_working_directory():
     script_directory = os.path.dirname(os.path.abspath(__file__))
@@ -36,25 +55,56 @@ def get_file_paths(directory):
 
 def load_data(file_paths):
     for path in file_paths:
-        df = pd.read_csv(path, usecols=['Time_Start', 'Renko_Open', 'Renko_Close', 'Volume', 'Moving_Average', 'Median'])
+        # Renko rows carry their volume as Volume or Volume_Total
+        df = pd.read_csv(path, usecols=lambda column: column in ['Time_Start', 'Renko_Open', 'Renko_Close', 'Volume',
+                                                                 'Volume_Total'])
         dataframes.append(df)
     return dataframes
 
+def get_volume_profile(index):
+    # Build the volume profile index once per file, queries for a window then only touch its occupied cells
+    if file_paths[index] not in volume_profiles:
+        df = dataframes[index]
+        times = pd.to_datetime(df["Time_Start"], format='mixed').to_numpy()
+        bricks = build_renko_bricks(df["Renko_Open"], df["Renko_Close"], BRICK_SIZE)
+        volume_profiles[file_paths[index]] = (times, renko_volume_profile(times, bricks, rows_input(df)['volume'], BRICK_SIZE))
+    return volume_profiles[file_paths[index]]
+
+def draw_volume_profile(axes):
+    # Redraw the side histogram for the rows visible in the Renko pane
+    times, profile = get_volume_profile(current_index)
+    left, right = axes.get_xlim()
+    first_row = int(np.clip(np.ceil(left), 0, len(times) - 1))
+    last_row = int(np.clip(np.floor(right), first_row, len(times) - 1))
+    window = window_profile(profile, times[first_row], times[last_row])
+
+    profile_ax.clear()
+    profile_ax.barh(window['level_prices'], window['volumes'], height=BRICK_SIZE, color=level_colors(window))
+    profile_ax.set_xticks([])
+    profile_ax.set_title("Volume Profile")
+    fig.canvas.draw_idle()
+
 # NEW: Modified for Renko plotting >> Start 
 def plot_data(index):
     df = dataframes[index]
     ax.clear()  # Clear the previous plot
+    ax.callbacks.connect('xlim_changed', draw_volume_profile)  # Clearing the axes drops its callbacks
     
     x_position = 0  # Initialize x-axis position
-    brick_size = 10  # Define the brick size
+    brick_size = BRICK_SIZE  # Define the brick size
     current_y_position = df["Renko_Open"].iloc[0]  # Start at the first Renko open price
     x_positions = []  # To track x positions for labeling
     time_labels = []  # To track time labels for the x-axis
     prev_row_renko_color = None
 
-    # Draw Moving Average and Median
-    ax.plot(df['Moving_Average'], label='Moving Average', color='blue', linewidth=2, linestyle='-')
-    ax.plot(df['Median'], label='Median', color='orange', linewidth=2, linestyle='-')
+    # Draw the selected overlays, computed once per file and served from the cache afterwards
+    selected_overlays = [label for label, checked in zip(OVERLAYS, overlay_checks.get_status()) if checked]
+    for label in selected_overlays:
+        name, params, color = OVERLAYS[label]
+        outputs = indicator_cache.get(file_paths[index], brick_size, name, lambda: rows_input(df), **params)
+        for output_name, values in outputs.items():
+            ax.plot(values, label=label if len(outputs) == 1 else f'{label} ({output_name.split("_")[-1]})',
+                    color=color, linewidth=2, linestyle='-')
 
     for i in range(len(df)):
         open_price = df["Renko_Open"].iloc[i]
@@ -120,12 +170,16 @@ def plot_data(index):
                 df[["Renko_Open", "Renko_Close"]].max().max() + brick_size)  # Ensure all values fit within the plot area
     
     # Add legend
-    ax.legend(loc='upper left')
+    if selected_overlays:
+        ax.legend(loc='upper left')
 
     plt.tight_layout()
     fig.canvas.draw_idle()
 # NEW: Modified for Renko plotting >> End
 
+def toggle_overlay(label):
+    plot_data(current_index)
+
 def next_plot(event):
     global current_index
     current_index = (current_index + 1) % len(dataframes)  # Loop back to the start
@@ -148,8 +202,13 @@ dataframes = load_data(file_paths)
 
 print("loading graph")
 
-# Initialize the plot and index tracking
-fig, ax = plt.subplots(figsize=(12, 6))
+# Initialize the plot and index tracking, with the volume profile next to the Renko pane
+fig, (ax, profile_ax) = plt.subplots(1, 2, figsize=(12, 6), sharey=True, gridspec_kw={'width_ratios': [7, 1]})
+
+# Create the overlay toggles before the first plot reads their state
+axoverlays = plt.axes([0.005, 0.005, 0.1, 0.18])  # Bottom left, clear of the profile pane
+overlay_checks = CheckButtons(axoverlays, list(OVERLAYS), [label in DEFAULT_OVERLAYS for label in OVERLAYS])
+overlay_checks.on_clicked(toggle_overlay)
 
 # Plot the first dataset initially
 plot_data(current_index)
@@ -1,151 +1,152 @@
 import os
 import re
-import pandas as pd
+import numpy as np
 
 # NEW: Modified for Renko plotting >> Start
 import plotly.graph_objects as go
 import dash
 
-from dash import Dash, dcc, html, Input, Output, State
+from dash import Dash, dcc, html, Input, Output, State, Patch
+from plotly.subplots import make_subplots
+
+from symbol_datasets import load_symbol_datasets, all_periods, period_label
+from renko_indicators import IndicatorCache, rows_input
+from volume_profile import renko_volume_profile, window_profile, level_colors
 
 # Constants
+DATA_DIRECTORY = r'./data/custom-format/renko-parsed'
 BRICK_SIZE = 10  # Define the brick size
 SHOW_LEGENDS = False  # Set to True to show the legend
 
+# Overlays that can be toggled on the chart: label -> (indicator, params, color)
+OVERLAYS = {
+    'Moving Average': ('sma', {'window': 5}, 'blue'),
+    'Median': ('median', {'window': 5}, 'orange'),
+    'EMA': ('ema', {'span': 20}, 'purple'),
+    'VWAP': ('vwap', {}, 'brown'),
+    'Bollinger': ('bollinger', {'window': 20, 'num_std': 2}, 'gray'),
+}
+DEFAULT_OVERLAYS = ['Moving Average', 'Median']
+
 # Initialize Dash app
 app = Dash(__name__)
 # NEW: Modified for Renko plotting >> End
 
-dataframes = []
-file_paths = []
-current_index = 0
+symbol_datasets = {}  # Symbol -> SymbolDataset
+periods = []  # Periods covered by any symbol, one page per period
+indicator_cache = IndicatorCache()
+volume_profiles = {}  # File path -> (dataset version, volume profile index)
 
 def change_working_directory():
     script_directory = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_directory)
 
-def get_file_paths(directory):
-    # Get all CSV files in the specified directory
-    all_files = [os.path.join(directory, file) for file in os.listdir(directory) if file.endswith('.csv')]
+def get_volume_profile(dataset, index):
+    # Build the volume profile index once per file, queries for a window then only touch its occupied cells
+    cached = volume_profiles.get(dataset.file_paths[index])
+    if cached is None or cached[0] != dataset.version:
+        df = dataset.frame(index)
+        profile = renko_volume_profile(df["Time_Start"], dataset.bricks(index), rows_input(df)['volume'], BRICK_SIZE)
+        cached = (dataset.version, profile)
+        volume_profiles[dataset.file_paths[index]] = cached
+    return cached[1]
 
-    # Custom sorting logic
-    def sort_key(filename):
-        # Check if "2023" is in the filename
-        is_2023 = "2023" in filename
+def get_visible_range(relayout_data):
+    # Visible time range from a zoom or pan of any Renko pane (the odd x axes), None for the full file
+    for key, value in relayout_data.items():
+        match = re.match(r'^xaxis(\d*)\.range(\[0\])?$', key)
+        if match and int(match.group(1) or 1) % 2 == 1:
+            if match.group(2):
+                return value, relayout_data[key.replace('[0]', '[1]')]
+            return tuple(value)
+    return None
 
-        # Extract the digit following "M"
-        match = re.search(r'M(\d+)', filename)
-        month_digit = int(match.group(1)) if match else float('inf')  # Use infinity as a fallback for unmatched cases
+def is_autorange(relayout_data):
+    # Reset of any Renko pane (the odd x axes); the profile axes rescale on their own
+    for key in relayout_data:
+        match = re.match(r'^xaxis(\d*)\.autorange$', key)
+        if match and int(match.group(1) or 1) % 2 == 1:
+            return True
+    return False
 
-        # Return tuple for sorting: (-is_2023 ensures 2023 files come first), then by month digit
-        return (-is_2023, month_digit)
+def profile_window(dataset, index, visible_range=None):
+    if index is None:
+        return [], [], []
+    start, end = (np.datetime64(value) for value in visible_range) if visible_range else (None, None)
+    window = window_profile(get_volume_profile(dataset, index), start, end)
+    return window['volumes'], window['level_prices'], level_colors(window)
 
-    # Sort the files based on the custom key
-    sorted_files = sorted(all_files, key=sort_key)
-    return sorted_files
-
-def load_data(file_paths):
-    # NEW: Modified for Renko plotting >> Start
-    dataframes = []
-    # NEW: Modified for Renko plotting >> End
-    for path in file_paths:
-        df = pd.read_csv(path, usecols=['Time_Start', 'Renko_Open', 'Renko_Close', 'Volume', 'Moving_Average', 'Median'])
-        dataframes.append(df)
-    return dataframes
+def selected_panes(period, symbols):
+    # (symbol, dataset, file index) for every selected symbol, the index is None without data for the period
+    return [
+        (symbol, symbol_datasets[symbol].dataset, symbol_datasets[symbol].index_of(period))
+        for symbol in symbols
+    ]
 
 # NEW: Modified for Renko plotting >> Start
-def plot_data(index):
-    df = dataframes[index]
-    file_name = os.path.basename(file_paths[index])
-    
-    fig = go.Figure()
-
-    # Generate colors and positions for each bar
-    colors = []
-    x_positions = []
-    y_starts = []
-    y_ends = []
-    brick_size = BRICK_SIZE  # Define the brick size
-    current_y_position = df["Renko_Open"].iloc[0]  # Start at the first Renko open price
-    prev_row_renko_color = None
-    x_position = 0  # Initialize x-axis position
-    
-    # Loop through dataframe to create stacked rectangles
-    for i in range(len(df)):
-        open_price = df["Renko_Open"].iloc[i]
-        close_price = df["Renko_Close"].iloc[i]
-        difference = close_price - open_price
-        
-        # Determine the color of the brick
-        color = 'green' if close_price >= open_price else 'red'
-        
-        # Adjust current_y_position based on previous color if it changes
-        if i > 0 and color != prev_row_renko_color:
-            if color == 'green':
-                current_y_position += brick_size
-            elif color == 'red':
-                current_y_position -= brick_size
-        
-        while abs(difference) >= brick_size:
-            y_start = current_y_position
-            y_end = y_start + (brick_size if difference > 0 else -brick_size)
-            
-            colors.append(color)
-            x_positions.append(df["Time_Start"].iloc[i])
-            y_starts.append(min(y_start, y_end))
-            y_ends.append(max(y_start, y_end))
-            
-            current_y_position = y_end  # Update the y-position for the next brick
-            difference = close_price - current_y_position
-        
-        # Draw the remaining part of the brick, if any
-        if abs(difference) > 0:
-            y_start = current_y_position
-            y_end = close_price
-            
-            colors.append(color)
-            x_positions.append(df["Time_Start"].iloc[i])
-            y_starts.append(min(y_start, y_end))
-            y_ends.append(max(y_start, y_end))
-            
-            current_y_position = y_end  # Update the y-position for the next brick
-        
-        prev_row_renko_color = color
-        x_position += 1  # Move to the next x position for the next time interval
-    
-    # Add bars for Renko bricks
-    fig.add_trace(go.Bar(
-        x=x_positions,
-        y=[y_end - y_start for y_start, y_end in zip(y_starts, y_ends)],
-        base=y_starts,
-        marker=dict(
-            color=colors,
-            line=dict(color='black', width=1)
-        ),
-        width=1,
-        name="Renko Bricks",
-    ))
-
-    # Plot Moving Average and Median
-    fig.add_trace(go.Scatter(
-        x=df["Time_Start"],
-        y=df["Moving_Average"],
-        mode='lines',  # Ensure it's lines-only
-        line=dict(color='blue', width=2),
-        name='Moving Average',
-    ))
-
-    fig.add_trace(go.Scatter(
-        x=df["Time_Start"],
-        y=df["Median"],
-        mode='lines',  # Ensure it's lines-only
-        line=dict(color='orange', width=2),
-        name='Median',
-    ))
+def plot_data(period_index, symbols, overlays=DEFAULT_OVERLAYS, visible_range=None):
+    period = periods[period_index]
+    page_label = period_label(period)
+    panes = selected_panes(period, symbols)
+
+    # One row per symbol: Renko pane on the left sharing the time axis, volume profile on the right
+    fig = make_subplots(rows=max(len(panes), 1), cols=2, shared_xaxes=True, shared_yaxes=True,
+                        column_widths=[0.88, 0.12], horizontal_spacing=0.005, vertical_spacing=0.02)
+    fig.update_xaxes(matches=None, showticklabels=False, col=2)  # Each symbol keeps its own volume scale
+
+    # The profiles are the first traces, one per row, so zooming can patch them without rebuilding the figure
+    for row, (symbol, dataset, index) in enumerate(panes, start=1):
+        volumes, level_prices, level_colors_ = profile_window(dataset, index, visible_range)
+        fig.add_trace(go.Bar(
+            x=volumes,
+            y=level_prices,
+            orientation='h',
+            marker=dict(color=level_colors_),
+            width=BRICK_SIZE,
+            name=f"{symbol} Volume Profile",
+        ), row=row, col=2)
+
+    for row, (symbol, dataset, index) in enumerate(panes, start=1):
+        fig.update_yaxes(title_text=symbol, tickformat=',', tickmode='auto', row=row, col=1)
+        if index is None:
+            continue
+
+        df = dataset.frame(index)
+        bricks = dataset.bricks(index)
 
+        # The bricks are built once when the dataset is published and shared by all workers
+        x_positions = df["Time_Start"].to_numpy()[bricks["brick_row"]]
+        colors = np.where(bricks["brick_is_up"], 'green', 'red')
+
+        # Add bars for Renko bricks
+        fig.add_trace(go.Bar(
+            x=x_positions,
+            y=bricks["brick_y_end"] - bricks["brick_y_start"],
+            base=bricks["brick_y_start"],
+            marker=dict(
+                color=colors,
+                line=dict(color='black', width=1)
+            ),
+            width=1,
+            name=f"{symbol} Renko Bricks",
+        ), row=row, col=1)
+
+        # Plot the selected overlays, computed once per file and served from the cache afterwards
+        for label in overlays:
+            name, params, color = OVERLAYS[label]
+            outputs = indicator_cache.get(dataset.file_paths[index], BRICK_SIZE, name, lambda: rows_input(df),
+                                          version=dataset.version, **params)
+            for output_name, values in outputs.items():
+                fig.add_trace(go.Scatter(
+                    x=df["Time_Start"],
+                    y=values,
+                    mode='lines',  # Ensure it's lines-only
+                    line=dict(color=color, width=2),
+                    name=label if len(outputs) == 1 else f'{label} ({output_name.split("_")[-1]})',
+                ), row=row, col=1)
+
+    fig.update_xaxes(title_text="Time Start", tickangle=-45, row=max(len(panes), 1), col=1)
     fig.update_layout(
-    xaxis_title="Time Start",
-    yaxis_title="",
     showlegend=SHOW_LEGENDS,  # Disable the legend
     legend=dict(
             orientation="h",  # Horizontal legend
@@ -155,20 +156,16 @@ def plot_data(index):
             x=0,
         ),
     margin=dict(l=0, r=0, t=0, b=0),  # Remove margins
-    xaxis_tickangle=-45,
+    uirevision=f'{page_label} {symbols}',  # Keep the zoom while overlays are toggled
     autosize=True,
     title={
-        'text': f'Renko Chart of {file_name}',
+        'text': f'Renko Chart of {", ".join(symbols)} for {page_label}',
         'x': 0.5,
         'xanchor': 'center',
         'y': 0.98,  # Adjust this value to move the title higher
         'yanchor': 'bottom',
         'font': {'size': 15}  # Adjust font size as needed
     },
-    yaxis=dict(
-            tickformat=',',  
-            tickmode='auto'  
-        )
 )
 
     return fig
@@ -179,10 +176,10 @@ def plot_data(index):
 
 change_working_directory()
 
-# Get the file paths from the "DATA" subdirectory
-file_paths = get_file_paths(r'./data/custom-format/renko-parsed')
-# Load all the data
-dataframes = load_data(file_paths)
+# Discover the files of every symbol in the "DATA" subdirectory and load the symbols concurrently,
+# each published once for all worker processes
+symbol_datasets = load_symbol_datasets(DATA_DIRECTORY, brick_size=BRICK_SIZE)
+periods = all_periods(symbol_datasets)
 
 # NEW: Modified for Renko plotting >> Start
 
@@ -190,9 +187,28 @@ dataframes = load_data(file_paths)
 app.layout = html.Div([
     html.Div([
         html.Button('Previous', id='prev-button', n_clicks=0, style={'marginRight': '10px'}),
-        html.Button('Next', id='next-button', n_clicks=0)
+        html.Button('Next', id='next-button', n_clicks=0),
+        dcc.Checklist(
+            id='overlay-checklist',
+            options=list(OVERLAYS),
+            value=DEFAULT_OVERLAYS,
+            inline=True,
+            style={'marginLeft': '20px'}
+        ),
+        dcc.Dropdown(
+            id='symbol-dropdown',
+            options=list(symbol_datasets),
+            value=list(symbol_datasets),
+            multi=True,
+            clearable=False,
+            style={'marginLeft': '20px', 'minWidth': '200px'}
+        )
     ], style={'display': 'flex', 'justifyContent': 'center', 'marginTop': '20px'}),
 
+    # Period, symbols and visible time range of the figure on screen. It is kept in the browser, not in module
+    # globals, because the requests of one user can be served by different worker processes
+    dcc.Store(id='view-store', data={'period_index': 0, 'symbols': list(symbol_datasets), 'visible_range': None}),
+
     dcc.Graph(
         id='renko-plot',
         style={'width': '100%', 'height': '100vh'}  # Adjust height as needed to use the remaining screen space
@@ -201,12 +217,14 @@ app.layout = html.Div([
 
 # Define callback to update the graph based on button clicks
 @app.callback(
-    Output('renko-plot', 'figure'),
-    [Input('prev-button', 'n_clicks'), Input('next-button', 'n_clicks')]
+    [Output('renko-plot', 'figure'), Output('view-store', 'data')],
+    [Input('prev-button', 'n_clicks'), Input('next-button', 'n_clicks'), Input('overlay-checklist', 'value'),
+     Input('symbol-dropdown', 'value'), Input('renko-plot', 'relayoutData')],
+    [State('view-store', 'data')]
 )
-def update_plot(prev_clicks, next_clicks):
-    global current_index
+def update_plot(prev_clicks, next_clicks, overlays, symbols, relayout_data, view):
     ctx = dash.callback_context
+    period_index = view['period_index']
 
     if not ctx.triggered:
         button_id = 'None'
@@ -214,12 +232,28 @@ def update_plot(prev_clicks, next_clicks):
         button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
     if button_id == 'prev-button':
-        current_index = (current_index - 1) % len(file_paths)
+        period_index = (period_index - 1) % len(periods)
     elif button_id == 'next-button':
-        current_index = (current_index + 1) % len(file_paths)
+        period_index = (period_index + 1) % len(periods)
+    elif button_id == 'renko-plot':
+        # Zoom or pan: only the profiles of the new window are sent back, for the panes of the figure on screen
+        if not relayout_data or (not is_autorange(relayout_data) and get_visible_range(relayout_data) is None):
+            return dash.no_update, dash.no_update
+        visible_range = get_visible_range(relayout_data)
+        patched_figure = Patch()
+        for trace, (symbol, dataset, index) in enumerate(selected_panes(periods[period_index], view['symbols'])):
+            volumes, level_prices, level_colors_ = profile_window(dataset, index, visible_range)
+            patched_figure['data'][trace]['x'] = volumes
+            patched_figure['data'][trace]['marker']['color'] = level_colors_
+        return patched_figure, dict(view, visible_range=visible_range)
 
-    fig = plot_data(current_index)
-    return fig
+    for symbol_dataset in symbol_datasets.values():
+        symbol_dataset.dataset.refresh()  # Pick up a new version if the data files changed
+    # Toggling an overlay keeps the zoom (same uirevision), so the profiles are rebuilt for the visible window;
+    # any other rebuild resets the view to the full period
+    visible_range = view['visible_range'] if button_id == 'overlay-checklist' else None
+    fig = plot_data(period_index, symbols, overlays, visible_range)
+    return fig, dict(view, period_index=period_index, symbols=symbols, visible_range=visible_range)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,51 @@
+import numpy as np
+
+# Density rendering for the scatter viewers.
+#
+# Above DENSITY_THRESHOLD visible points the viewers stop drawing one marker
+# per point: all series are binned into a grid about the size of the plot in
+# pixels and drawn as a single image, so the cost of a redraw depends on the
+# grid size, not on the number of rows. The grid is rebuilt for the visible
+# window whenever the view is zoomed or panned.
+
+DENSITY_THRESHOLD = 20000  # Visible points above which the density image is drawn
+PIXELS_PER_BIN = 2
+
+def series_range(series, margin=0.02):
+    # Value range of the series with a small margin; the indicator columns use 0 before their first value
+    values = np.concatenate([np.asarray(values, dtype=np.float64) for values in series])
+    values = values[np.isfinite(values) & (values > 0)]
+    if len(values) == 0:
+        return 0.0, 1.0
+    padding = (values.max() - values.min()) * margin
+    return values.min() - padding, values.max() + padding
+
+def _visible(x, values, x_range, y_range):
+    return (
+        (x >= x_range[0]) & (x <= x_range[1])
+        & (values >= y_range[0]) & (values <= y_range[1])
+    )
+
+def visible_points(x, series, x_range, y_range):
+    # Mask of the rows of each series that fall inside the window
+    x = np.asarray(x, dtype=np.float64)
+    return [_visible(x, np.asarray(values, dtype=np.float64), x_range, y_range) for values in series]
+
+def use_density(masks, threshold=DENSITY_THRESHOLD):
+    return sum(int(mask.sum()) for mask in masks) > threshold
+
+def grid_shape(width_pixels, height_pixels, pixels_per_bin=PIXELS_PER_BIN):
+    # (rows, columns) of a grid matching the plot size on screen
+    return max(int(height_pixels // pixels_per_bin), 1), max(int(width_pixels // pixels_per_bin), 1)
+
+def density_grid(x, series, x_range, y_range, shape):
+    # Count the points of all series per cell; empty cells are NaN so they render transparent
+    x = np.asarray(x, dtype=np.float64)
+    xs = np.concatenate([x] * len(series))
+    ys = np.concatenate([np.asarray(values, dtype=np.float64) for values in series])
+    finite = np.isfinite(ys)
+    counts, y_edges, x_edges = np.histogram2d(ys[finite], xs[finite], bins=shape, range=[y_range, x_range])
+    # Log scale so a few dense price levels do not wash out the rest
+    density = np.log1p(counts)
+    density[counts == 0] = np.nan
+    return density, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
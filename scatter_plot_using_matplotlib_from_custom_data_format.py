@@ -2,11 +2,25 @@ import os
 import re
 import pandas as pd
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 
 from matplotlib.widgets import Button
 
+from scatter_density import series_range, visible_points, use_density, grid_shape, density_grid
+
+# Series drawn on the chart: column -> (label, color, marker)
+SERIES = {
+    'Renko_Open': ('Renko Open', 'lightgrey', 'o'),
+    'Renko_Close': ('Renko Close', 'red', 'x'),
+    'Indicator_1': ('Indicator 1', 'blue', 'o'),
+}
+
 dataframes = []
 current_index = 0
+x_values = {}  # File index -> Time_Start as Matplotlib date numbers
+point_artists = []  # Markers or density image currently drawn
+redraw_timer = None  # Single-shot timer that redraws the points once per view change
+redraw_pending = False
 
 def change_working_directory():
     script_directory = os.path.dirname(os.path.abspath(__file__))
@@ -38,36 +52,80 @@ def load_data(file_paths):
         dataframes.append(df)
     return dataframes
 
+def get_x_values(index):
+    if index not in x_values:
+        x_values[index] = mdates.date2num(pd.to_datetime(dataframes[index]['Time_Start'], format='mixed'))
+    return x_values[index]
+
+def draw_points(axes=None):
+    # Draw the visible window as markers, or as one density image when there are too many points
+    df = dataframes[current_index]
+    x = get_x_values(current_index)
+    series = [df[column].to_numpy() for column in SERIES]
+    x_range, y_range = ax.get_xlim(), ax.get_ylim()
+    masks = visible_points(x, series, x_range, y_range)
+
+    for artist in point_artists:
+        artist.remove()
+    point_artists.clear()
+    if ax.get_legend():
+        ax.get_legend().remove()
+
+    if use_density(masks):
+        shape = grid_shape(ax.bbox.width, ax.bbox.height)
+        density, _, _ = density_grid(x, series, x_range, y_range, shape)
+        point_artists.append(ax.imshow(density, extent=(*x_range, *y_range), origin='lower', aspect='auto',
+                                       cmap='viridis', interpolation='nearest'))
+        ax.set_title(f'File: {os.path.basename(file_paths[current_index])} (density)')
+    else:
+        for (label, color, marker), values, mask in zip(SERIES.values(), series, masks):
+            point_artists.append(ax.scatter(x[mask], values[mask], color=color, marker=marker, label=label))
+        ax.set_title(f'File: {os.path.basename(file_paths[current_index])}')
+        ax.legend()
+
+    fig.canvas.draw_idle()
+
+def request_redraw(axes=None):
+    # A zoom or pan changes both limits; the timer runs once the event is handled, so the window is rebinned once
+    global redraw_pending
+    if not redraw_pending:
+        redraw_pending = True
+        redraw_timer.start()
+
+def redraw_points():
+    global redraw_pending
+    redraw_pending = False
+    draw_points()
+
 # NEW: Modified for Renko plotting >> Start
 def plot_data(index):
     df = dataframes[index]
 
     ax.clear()  # Clear the previous plot
+    point_artists.clear()
 
-    # Plot Renko_Close as crosses
-    ax.scatter(df['Time_Start'], df['Renko_Open'], color='lightgrey', marker='o', label='Renko Open')
-
-    # Plot Renko_Close as crosses
-    ax.scatter(df['Time_Start'], df['Renko_Close'], color='red', marker='x', label='Renko Close')
-
-    # Plot Indicator_1 as dots
-    ax.scatter(df['Time_Start'], df['Indicator_1'], color='blue', marker='o', label='Indicator 1')
+    # Start from the full data range; zooming and panning redraw only the visible window
+    x = get_x_values(index)
+    ax.set_xlim(x.min(), x.max())
+    ax.set_ylim(*series_range([df[column] for column in SERIES]))
+    ax.set_autoscale_on(False)
+    ax.xaxis_date()
 
     # Adding labels, title, and legend
     ax.set_xlabel('Time Start')
     ax.set_ylabel('Values')
 
-    ax.set_title(f'File: {os.path.basename(file_paths[index])}')
-
-    ax.legend()
-
     # Rotate x-axis labels
     plt.setp(ax.get_xticklabels(), rotation=45)
 
     # Adjust layout and display the plot
     plt.tight_layout()
 
-    fig.canvas.draw_idle()
+    draw_points()
+
+    # Clearing the axes drops its callbacks, so they are connected again for every file
+    ax.callbacks.connect('xlim_changed', request_redraw)
+    ax.callbacks.connect('ylim_changed', request_redraw)
 # NEW: Modified for Renko plotting >> Start
 
 def next_plot(event):
@@ -94,6 +152,9 @@ print("loading graph")
 
 # Initialize the plot and index tracking
 fig, ax = plt.subplots(figsize=(12, 6))
+redraw_timer = fig.canvas.new_timer(interval=0)
+redraw_timer.single_shot = True
+redraw_timer.add_callback(redraw_points)
 
 # Plot the first dataset initially
 plot_data(current_index)
@@ -1,22 +1,28 @@
 import os
 import re
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 
 import dash
 
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, State
+
+from shared_dataset_store import load_shared_dataset
+from scatter_density import visible_points, use_density, grid_shape, density_grid
 
 DATA_DIRECTORY = r'./data/custom-format/renko-parsed'
 SHOW_LEGENDS = False
+SERIES = ["Renko_Open", "Renko_Close", "Moving_Average", "Median"]
+DENSITY_GRID_PIXELS = (1600, 800)  # Approximate plot size in pixels used to size the density grid
 
 # Initialize Dash app
 app = Dash(__name__)
 # NEW: Modified for Renko plotting >> End
 
-dataframes = []
+dataset = None
 file_paths = []
-current_index = 0
 
 def change_working_directory():
     script_directory = os.path.dirname(os.path.abspath(__file__))
@@ -42,32 +48,68 @@ def get_file_paths(directory):
     sorted_files = sorted(all_files, key=sort_key)
     return sorted_files
 
-def load_data(file_paths):
-
-    dataframes = []
-
-    for path in file_paths:
-        df = pd.read_csv(path, usecols=['Time_Start', 'Time_End', 'Renko_Open', 'Renko_Close', 'Volume', 'Moving_Average', 'Median'])
-        dataframes.append(df)
-    return dataframes
-
-def plot_data(index):
-    df = dataframes[index]
+def to_seconds(times):
+    return np.asarray(times, dtype='datetime64[ms]').astype(np.int64) / 1000
+
+def get_axis_range(relayout_data, axis):
+    # Range of one axis from a zoom or pan, sent either as axis.range[0]/[1] or as the axis.range list
+    if f'{axis}.range[0]' in relayout_data:
+        return relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']
+    if f'{axis}.range' in relayout_data:
+        return tuple(relayout_data[f'{axis}.range'])
+    return None
+
+def get_visible_window(relayout_data, x_range=None, y_range=None):
+    # Window after a relayout event, starting from the current one; None for the full range of an axis.
+    # Lists rather than tuples, so it compares equal to the window stored in the browser
+    x_zoom = get_axis_range(relayout_data, 'xaxis')
+    if x_zoom is not None:
+        x_range = [float(to_seconds(np.datetime64(value))) for value in x_zoom]
+    elif relayout_data.get('xaxis.autorange'):
+        x_range = None
+    y_zoom = get_axis_range(relayout_data, 'yaxis')
+    if y_zoom is not None:
+        y_range = list(y_zoom)
+    elif relayout_data.get('yaxis.autorange'):
+        y_range = None
+    return x_range, y_range
+
+def plot_data(index, x_range=None, y_range=None):
+    df = dataset.frame(index)
     file_name = os.path.basename(file_paths[index])
-    
-    fig = px.scatter(
-        df,
-        x="Time_Start",
-        y=["Renko_Open", "Renko_Close", "Moving_Average", "Median"],
-        labels={"value": "Values", "variable": "Legend"},
-        title=f"File: {file_name}",
-        color_discrete_map={
-            "Renko_Open": "lightgray",
-            "Renko_Close": "red",
-            "Moving_Average": "blue",
-            "Median": "orange"
-        },
-    )
+
+    # Full file unless zoomed; beyond the density threshold the window is drawn as one heatmap
+    x = to_seconds(df["Time_Start"])
+    x_range = x_range or (x.min(), x.max())
+    y_range = y_range or (df['Renko_Open'].min() * 0.98, df['Renko_Close'].max() * 1.02)
+    series = [df[column].to_numpy() for column in SERIES]
+    masks = visible_points(x, series, x_range, y_range)
+
+    if use_density(masks):
+        density, x_centers, y_centers = density_grid(x, series, x_range, y_range, grid_shape(*DENSITY_GRID_PIXELS))
+        fig = go.Figure(go.Heatmap(
+            x=pd.to_datetime(x_centers, unit='s'),
+            y=y_centers,
+            z=density,
+            colorscale='Viridis',
+            showscale=False,
+            hoverinfo='skip',
+        ))
+    else:
+        rows = (x >= x_range[0]) & (x <= x_range[1])
+        fig = px.scatter(
+            df[rows],
+            x="Time_Start",
+            y=SERIES,
+            labels={"value": "Values", "variable": "Legend"},
+            title=f"File: {file_name}",
+            color_discrete_map={
+                "Renko_Open": "lightgray",
+                "Renko_Close": "red",
+                "Moving_Average": "blue",
+                "Median": "orange"
+            },
+        )
 
     fig.update_layout(
         xaxis_title="Time Start",
@@ -82,6 +124,8 @@ def plot_data(index):
             x=0,
         ),
         xaxis_tickangle=-45,
+        xaxis_range=pd.to_datetime(x_range, unit='s'),
+        uirevision=file_name,  # Keep the zoom when the window is redrawn
         autosize=True,
         title={
             'text': f'Renko Chart of {file_name}',
@@ -94,7 +138,7 @@ def plot_data(index):
         yaxis=dict(
         tickformat=',',
         tickmode='auto',
-        range=[df['Renko_Open'].min() * 0.98, df['Renko_Close'].max() * 1.02]  # Dynamically set y-axis range
+        range=list(y_range)  # Dynamically set y-axis range
     )
     )
 
@@ -107,8 +151,8 @@ change_working_directory()
 # Get the file paths from the "DATA" subdirectory
 file_paths = get_file_paths(DATA_DIRECTORY)
 
-# Load all the data
-dataframes = load_data(file_paths)
+# Publish the data once for all worker processes and attach to it
+dataset = load_shared_dataset(file_paths)
 
 print("loading graph")
 
@@ -119,6 +163,10 @@ app.layout = html.Div([
         html.Button('Next', id='next-button', n_clicks=0)
     ], style={'display': 'flex', 'justifyContent': 'center', 'marginTop': '20px'}),
 
+    # File and window of the figure on screen. It is kept in the browser, not in module globals,
+    # because the requests of one user can be served by different worker processes
+    dcc.Store(id='view-store', data={'index': 0, 'x_range': None, 'y_range': None}),
+
     dcc.Graph(
         id='renko-plot',
         style={'width': '100%', 'height': '100vh'}  # Adjust height as needed to use the remaining screen space
@@ -127,12 +175,13 @@ app.layout = html.Div([
 
 # Define callback to update the graph based on button clicks
 @app.callback(
-    Output('renko-plot', 'figure'),
-    [Input('prev-button', 'n_clicks'), Input('next-button', 'n_clicks')]
+    [Output('renko-plot', 'figure'), Output('view-store', 'data')],
+    [Input('prev-button', 'n_clicks'), Input('next-button', 'n_clicks'), Input('renko-plot', 'relayoutData')],
+    [State('view-store', 'data')]
 )
-def update_plot(prev_clicks, next_clicks):
-    global current_index
+def update_plot(prev_clicks, next_clicks, relayout_data, view):
     ctx = dash.callback_context
+    index = view['index']
 
     if not ctx.triggered:
         button_id = 'None'
@@ -140,12 +189,19 @@ def update_plot(prev_clicks, next_clicks):
         button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
     if button_id == 'prev-button':
-        current_index = (current_index - 1) % len(file_paths)
+        index = (index - 1) % len(file_paths)
     elif button_id == 'next-button':
-        current_index = (current_index + 1) % len(file_paths)
-
-    fig = plot_data(current_index)
-    return fig
+        index = (index + 1) % len(file_paths)
+    elif button_id == 'renko-plot':
+        # Zoom or pan: redraw the visible window of the file on screen, re-binned or as markers
+        x_range, y_range = get_visible_window(relayout_data or {}, view['x_range'], view['y_range'])
+        if (x_range, y_range) == (view['x_range'], view['y_range']):
+            return dash.no_update, dash.no_update
+        return plot_data(index, x_range, y_range), dict(view, x_range=x_range, y_range=y_range)
+
+    dataset.refresh()  # Pick up a new version if the data files changed
+    fig = plot_data(index)
+    return fig, dict(view, index=index, x_range=None, y_range=None)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
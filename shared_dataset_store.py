@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import hashlib
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from renko_bricks import build_renko_bricks, build_renko_bricks_parallel
+
+# Publishes the numeric columns of the data files (and the Renko bricks built
+# from them) once as .npy files, so every worker process of the Dash apps can
+# memory-map the same pages read-only instead of holding its own DataFrames.
+#
+# Layout of the cache directory, one store per (file list, brick size):
+#   <store key>/manifest.json          -> points at the current version directory
+#   <store key>/<version>/<nnn>/<column>.npy
+# A new version is written to <version>.partial, renamed once complete and
+# only becomes visible when manifest.json is replaced, so readers never see a
+# partial one and cleanup never touches a version that is still being written.
+
+DEFAULT_CACHE_DIRECTORY = r'./data/cache/shared-store'
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = 'publish.lock'
+LOCK_TIMEOUT_SECONDS = 60  # A lock not refreshed for this long is considered abandoned
+LOCK_HEARTBEAT_SECONDS = LOCK_TIMEOUT_SECONDS / 4  # The publisher touches its lock this often
+ATTACH_RETRIES = 20
+PARTIAL_SUFFIX = '.partial'
+ABANDONED_PARTIAL_SECONDS = 24 * 60 * 60  # A partial version older than this was left by a crashed publisher
+
+def store_directory(cache_directory, file_paths, brick_size):
+    # Consumers with different files, file order or brick size get their own store and never replace each other's data
+    key = json.dumps([[os.path.abspath(path) for path in file_paths], brick_size])
+    return os.path.join(cache_directory, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def _read_manifest(cache_directory):
+    try:
+        with open(os.path.join(cache_directory, MANIFEST_FILE), 'r') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+def _is_stale(manifest, file_paths, brick_size):
+    if manifest is None or manifest.get('brick_size') != brick_size:
+        return True
+    published = [(entry['path'], entry['mtime_ns'], entry['size']) for entry in manifest['files']]
+    try:
+        current = [tuple(_source_signature(path).values()) for path in file_paths]
+    except OSError:
+        return True
+    return published != current
+
+def _read_columns(path):
+    # Keep only the numeric columns, with the Time_* columns stored as epoch seconds
+    df = pd.read_csv(path)
+    columns = {}
+    for name in df.columns:
+        if name.startswith('Time_'):
+            # Month-first dates, but the seconds are missing in some exports
+            times = pd.to_datetime(df[name], format='mixed')
+            columns[name] = times.to_numpy().astype('datetime64[s]')
+        elif pd.api.types.is_numeric_dtype(df[name]):
+            columns[name] = df[name].to_numpy()
+    return columns
+
+def _lock_token():
+    # Identifies the holder of the lock, so a publisher never removes a lock another one has taken over
+    return f'{os.getpid()}-{threading.get_ident()}-{time.time_ns()}'
+
+def _read_lock_token(lock_path):
+    try:
+        with open(lock_path, 'r') as lock_file:
+            return lock_file.read()
+    except OSError:
+        return None
+
+def _acquire_publish_lock(cache_directory, token):
+    lock_path = os.path.join(cache_directory, LOCK_FILE)
+    try:
+        if time.time() - os.path.getmtime(lock_path) > LOCK_TIMEOUT_SECONDS:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(lock_fd, 'w') as lock_file:
+        lock_file.write(token)
+    return True
+
+def _keep_publish_lock(cache_directory, token, stop):
+    # Heartbeat: refresh the lock's mtime while publishing, so a slow publish is not taken for an abandoned one
+    lock_path = os.path.join(cache_directory, LOCK_FILE)
+    while not stop.wait(LOCK_HEARTBEAT_SECONDS):
+        if _read_lock_token(lock_path) != token:
+            return
+        try:
+            os.utime(lock_path)
+        except OSError:
+            return
+
+def _release_publish_lock(cache_directory, token):
+    lock_path = os.path.join(cache_directory, LOCK_FILE)
+    if _read_lock_token(lock_path) == token:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def _remove_old_versions(directory, keep_version):
+    # Only versions of this store are removed; partial ones belong to a publisher that may still be writing
+    for entry in os.listdir(directory):
+        entry_path = os.path.join(directory, entry)
+        if entry == keep_version or not os.path.isdir(entry_path):
+            continue
+        if entry.endswith(PARTIAL_SUFFIX):
+            try:
+                if time.time() - os.path.getmtime(entry_path) < ABANDONED_PARTIAL_SECONDS:
+                    continue
+            except OSError:
+                continue
+        # Versions still mapped by another process cannot be removed on Windows, skip them
+        shutil.rmtree(entry_path, ignore_errors=True)
+
+def _publish_file(path, version_directory, directory, brick_size, brick_executor=None):
+    signature = _source_signature(path)
+    columns = _read_columns(path)
+    if 'Renko_Open' in columns and 'Renko_Close' in columns:
+        if brick_executor is None:
+            bricks = build_renko_bricks(columns['Renko_Open'], columns['Renko_Close'], brick_size)
+        else:
+            bricks = build_renko_bricks_parallel(columns['Renko_Open'], columns['Renko_Close'], brick_size,
+                                                 executor=brick_executor)
+        columns.update(bricks)
+
+    file_directory = os.path.join(version_directory, directory)
+    os.makedirs(file_directory)
+    for name, values in columns.items():
+        np.save(os.path.join(file_directory, f'{name}.npy'), values)
+    return dict(signature, directory=directory, columns=list(columns))
+
+def publish_dataset(file_paths, cache_directory=DEFAULT_CACHE_DIRECTORY, brick_size=10, max_workers=None,
+                    parallel_bricks=False):
+    directory = store_directory(cache_directory, file_paths, brick_size)
+    os.makedirs(directory, exist_ok=True)
+    version = f'{time.time_ns()}-{os.getpid()}'
+    version_directory = os.path.join(directory, version + PARTIAL_SUFFIX)
+
+    # Long histories can build their bricks on a process pool. It spawns new processes,
+    # so only enable it from scripts guarded by `if __name__ == '__main__'`
+    brick_executor = ProcessPoolExecutor() if parallel_bricks else None
+    try:
+        # The files are read on a thread pool, reading the CSVs is mostly I/O
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            files = list(executor.map(
+                lambda item: _publish_file(item[1], version_directory, f'{item[0]:03d}', brick_size, brick_executor),
+                enumerate(file_paths)
+            ))
+    finally:
+        if brick_executor is not None:
+            brick_executor.shutdown()
+
+    os.rename(version_directory, os.path.join(directory, version))
+
+    manifest = {'version': version, 'brick_size': brick_size, 'files': files}
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    temporary_path = f'{manifest_path}.{version}.tmp'
+    with open(temporary_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temporary_path, manifest_path)  # Atomic switch to the new version
+
+    _remove_old_versions(directory, version)
+    return manifest
+
+def _attach_version(directory, manifest):
+    version_directory = os.path.join(directory, manifest['version'])
+    arrays = []
+    for entry in manifest['files']:
+        file_directory = os.path.join(version_directory, entry['directory'])
+        arrays.append({
+            name: np.load(os.path.join(file_directory, f'{name}.npy'), mmap_mode='r')
+            for name in entry['columns']
+        })
+    return arrays
+
+class SharedDataset:
+    def __init__(self, file_paths, cache_directory, brick_size, max_workers=None, parallel_bricks=False):
+        self.file_paths = list(file_paths)
+        self.cache_directory = cache_directory
+        self.brick_size = brick_size
+        self.max_workers = max_workers
+        self.parallel_bricks = parallel_bricks
+        self.directory = store_directory(cache_directory, self.file_paths, brick_size)
+        self.version = None
+        self.arrays = []
+        self.refresh()
+
+    def __len__(self):
+        return len(self.file_paths)
+
+    def refresh(self):
+        # Republish if a source file changed, then re-attach if another process published a new version
+        manifest = _read_manifest(self.directory)
+        while _is_stale(manifest, self.file_paths, self.brick_size):
+            os.makedirs(self.directory, exist_ok=True)
+            token = _lock_token()
+            if _acquire_publish_lock(self.directory, token):
+                stop = threading.Event()
+                heartbeat = threading.Thread(target=_keep_publish_lock, args=(self.directory, token, stop), daemon=True)
+                heartbeat.start()
+                try:
+                    manifest = _read_manifest(self.directory)
+                    if _is_stale(manifest, self.file_paths, self.brick_size):
+                        manifest = publish_dataset(self.file_paths, self.cache_directory, self.brick_size,
+                                                   self.max_workers, self.parallel_bricks)
+                finally:
+                    stop.set()
+                    heartbeat.join()
+                    _release_publish_lock(self.directory, token)
+                break
+            if self.version is not None:
+                break  # Another worker is publishing, keep the attached version until the next refresh
+            time.sleep(0.1)  # Nothing attached yet, wait for the other worker to finish
+            manifest = _read_manifest(self.directory)
+
+        for _ in range(ATTACH_RETRIES):
+            if manifest is None or manifest['version'] == self.version:
+                break
+            try:
+                self.arrays = _attach_version(self.directory, manifest)
+                self.version = manifest['version']
+                break
+            except FileNotFoundError:
+                # A newer publish removed this version after the manifest was read, attach the current one
+                time.sleep(0.1)
+                manifest = _read_manifest(self.directory)
+        return self
+
+    def frame(self, index):
+        # Zero-copy DataFrame over the memory-mapped columns of one file
+        columns = {name: values for name, values in self.arrays[index].items() if not name.startswith('brick_')}
+        return pd.DataFrame(columns, copy=False)
+
+    def bricks(self, index):
+        return {name: values for name, values in self.arrays[index].items() if name.startswith('brick_')}
+
+def load_shared_dataset(file_paths, cache_directory=DEFAULT_CACHE_DIRECTORY, brick_size=10, max_workers=None,
+                        parallel_bricks=False):
+    return SharedDataset(file_paths, cache_directory, brick_size, max_workers, parallel_bricks)
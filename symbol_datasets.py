@@ -0,0 +1,123 @@
+import os
+import re
+import datetime
+
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_dataset_store import load_shared_dataset
+
+# Symbol-aware dataset layout.
+#
+# Data files are named <symbol>-<mon>-<dd>[-<yyyy>]-to-<mon>-<dd>-<yyyy>-..., e.g.
+# nq-apr-01-to-apr-30-2024-for-renko-parsed-m.csv or
+# nq-dec-01-2023-to-jan-31-2024-...csv, and may sit directly in the data
+# directory or in sub-directories. Files are grouped by symbol and keyed by
+# the month their period starts in, so the files of different symbols for the
+# same month share a page, and the symbols are loaded concurrently, each into
+# its own shared store.
+#
+# Files whose names have no dates (e.g. NQ 2023 M1.csv), or that start in a
+# month the symbol already has a file for, keep the old one page per file:
+# their period is the file name, ordered after the dated periods. Files whose
+# names do not start with a symbol (e.g. Excel's ~$... lock files) are skipped.
+
+FILE_NAME_PATTERN = re.compile(
+    r'^(?P<symbol>[a-z0-9]+)-(?P<start_month>[a-z]{3})-(?P<start_day>\d{1,2})(?:-(?P<start_year>\d{4}))?'
+    r'-to-(?P<end_month>[a-z]{3})-(?P<end_day>\d{1,2})-(?P<end_year>\d{4})',
+    re.IGNORECASE
+)
+SYMBOL_PATTERN = re.compile(r'^[a-z0-9]+', re.IGNORECASE)
+CACHE_DIRECTORY = r'./data/cache/symbols'  # One shared store per symbol below this directory
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+def _parse_period(match):
+    # First day of the month the period starts in, None when the dates are not valid
+    start_month = match.group('start_month').lower()
+    end_month = match.group('end_month').lower()
+    if start_month not in MONTHS or end_month not in MONTHS:
+        return None
+    year = int(match.group('end_year'))
+    if match.group('start_year'):
+        year = int(match.group('start_year'))
+    elif MONTHS.index(start_month) > MONTHS.index(end_month):
+        year -= 1  # The period runs into the next year, e.g. dec-01-to-jan-31-2024
+    try:
+        start = datetime.date(year, MONTHS.index(start_month) + 1, int(match.group('start_day')))
+    except ValueError:
+        return None
+    return start.replace(day=1)
+
+def parse_file_name(path):
+    # (symbol, period) of a data file; the period is the start month, or the file name when the name has no dates
+    name = os.path.basename(path)
+    symbol = SYMBOL_PATTERN.match(name)
+    if symbol is None:
+        raise ValueError(f'Cannot find a symbol at the start of the file name: {name}')
+    match = FILE_NAME_PATTERN.match(name)
+    period = _parse_period(match) if match else None
+    return symbol.group(0).upper(), period if period is not None else name
+
+def period_sort_key(period):
+    # Dated periods first, then the undated files in the order of the old file-per-page viewers
+    if isinstance(period, datetime.date):
+        return 0, period.toordinal(), 0, ''
+    month = re.search(r'M(\d+)', period)
+    return 1, -("2023" in period), int(month.group(1)) if month else float('inf'), period
+
+def period_label(period):
+    return period.strftime('%b %Y') if isinstance(period, datetime.date) else period
+
+def discover_files(directory, extension='.csv'):
+    # Symbol -> [(period, path), ...] ordered by period, undated files last
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.endswith(extension):
+                path = os.path.join(root, name)
+                try:
+                    symbol, period = parse_file_name(path)
+                except ValueError as e:
+                    print(f"Skipping {path}: {e}")
+                    continue
+                files.setdefault(symbol, []).append((period, path))
+    for symbol in files:
+        files[symbol].sort(key=lambda item: (period_sort_key(item[0]), item[1]))
+        # A month can only be one page of a symbol, any further file of that month gets a page of its own
+        seen = set()
+        for position, (period, path) in enumerate(files[symbol]):
+            if period in seen:
+                print(f"{path}: {symbol} already has a file for {period_label(period)}, shown on its own page")
+                files[symbol][position] = (os.path.basename(path), path)
+            seen.add(period)
+        files[symbol].sort(key=lambda item: (period_sort_key(item[0]), item[1]))
+    return dict(sorted(files.items()))
+
+def load_symbol_datasets(directory, symbols=None, brick_size=10, cache_directory=CACHE_DIRECTORY,
+                         max_workers=None):
+    # Symbol -> SymbolDataset, with every symbol (and every file of a symbol) read on a thread pool,
+    # so the load time is bounded by the slowest file rather than the sum of all files
+    files = discover_files(directory)
+    if symbols is not None:
+        files = {symbol: files[symbol] for symbol in symbols if symbol in files}
+
+    def load(symbol):
+        file_paths = [path for _, path in files[symbol]]
+        dataset = load_shared_dataset(file_paths, os.path.join(cache_directory, symbol.lower()), brick_size, max_workers)
+        return SymbolDataset(symbol, [period for period, _ in files[symbol]], dataset)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(files, executor.map(load, files)))
+
+def all_periods(symbol_datasets):
+    # Sorted union of the periods of all symbols
+    return sorted({period for dataset in symbol_datasets.values() for period in dataset.periods}, key=period_sort_key)
+
+class SymbolDataset:
+    def __init__(self, symbol, periods, dataset):
+        self.symbol = symbol
+        self.periods = periods
+        self.dataset = dataset
+
+    def index_of(self, period):
+        # Index of the file covering the period, None when the symbol has no data for it
+        return self.periods.index(period) if period in self.periods else None
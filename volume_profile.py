@@ -0,0 +1,113 @@
+import numpy as np
+
+from renko_indicators import bricks_input
+
+# Volume-at-price profile over any time window.
+#
+# The volume of a file is binned once into (time bucket, price level) cells.
+# Only the cells that hold volume are kept, sorted by time, so nights and
+# weekends cost nothing and the index stays a small fraction of the data. The
+# cells of any window are one contiguous slice, found with a binary search,
+# and the profile is their sum per level: O(occupied cells in the window).
+# Windows are snapped outward to whole time buckets.
+
+DEFAULT_BUCKET_SECONDS = 15 * 60
+VALUE_AREA_FRACTION = 0.7
+
+def build_volume_profile(times, prices, volumes, price_step, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+    times = np.asarray(times, dtype='datetime64[s]').astype(np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+
+    if len(times) == 0:
+        return {
+            'bucket_seconds': bucket_seconds,
+            'level_prices': np.zeros(0),
+            'cell_times': np.zeros(0, dtype='datetime64[s]'),
+            'cell_levels': np.zeros(0, dtype=np.int64),
+            'cell_volumes': np.zeros(0),
+        }
+
+    levels = np.floor(prices / price_step).astype(np.int64)
+    first_level = levels.min()
+    level_count = levels.max() - first_level + 1
+
+    # Sum the volume of every occupied (bucket, level) cell; np.unique sorts them by bucket, then level
+    buckets = times // bucket_seconds
+    cells, cell_index = np.unique(buckets * level_count + (levels - first_level), return_inverse=True)
+    cell_volumes = np.bincount(cell_index.ravel(), weights=volumes, minlength=len(cells))
+    occupied = cell_volumes != 0
+    cells = cells[occupied]
+
+    return {
+        'bucket_seconds': bucket_seconds,
+        'level_prices': (first_level + np.arange(level_count) + 0.5) * price_step,  # Center of each level
+        'cell_times': ((cells // level_count) * bucket_seconds).astype('datetime64[s]'),  # Start of the cell's bucket
+        'cell_levels': cells % level_count,
+        'cell_volumes': cell_volumes[occupied],
+    }
+
+def renko_volume_profile(times, bricks, row_volume, brick_size, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+    # Spread each row's volume over its bricks and bin it at the brick midpoints, one level per brick
+    volumes = bricks_input(bricks, row_volume)['volume']
+    prices = (np.asarray(bricks['brick_y_start']) + np.asarray(bricks['brick_y_end'])) / 2
+    brick_times = np.asarray(times, dtype='datetime64[s]')[bricks['brick_row']]
+    return build_volume_profile(brick_times, prices, volumes, brick_size, bucket_seconds)
+
+def volume_at_price(profile, start=None, end=None):
+    # Volume per price level between two times (inclusive), None means the start or end of the file
+    cell_times = profile['cell_times']
+    bucket_seconds = profile['bucket_seconds']
+    first = 0
+    if start is not None:
+        bucket_start = int(np.datetime64(start, 's').astype(np.int64)) // bucket_seconds * bucket_seconds
+        first = np.searchsorted(cell_times, np.datetime64(bucket_start, 's'), side='left')
+    last = len(cell_times) if end is None else np.searchsorted(cell_times, np.datetime64(end, 's'), side='right')
+    last = max(last, first)
+    return np.bincount(profile['cell_levels'][first:last], weights=profile['cell_volumes'][first:last],
+                       minlength=len(profile['level_prices'])).astype(np.float64)
+
+def point_of_control(volumes):
+    # Index of the price level with the most volume
+    return int(np.argmax(volumes)) if len(volumes) and volumes.max() > 0 else None
+
+def value_area(volumes, fraction=VALUE_AREA_FRACTION):
+    # Grow the range around the point of control towards the heavier neighbour
+    # until it holds the requested fraction of the volume; returns (low, high) level indexes
+    poc = point_of_control(volumes)
+    if poc is None:
+        return None
+    target = volumes.sum() * fraction
+    low = high = poc
+    total = volumes[poc]
+    while total < target and (low > 0 or high < len(volumes) - 1):
+        below = volumes[low - 1] if low > 0 else -1
+        above = volumes[high + 1] if high < len(volumes) - 1 else -1
+        if above >= below:
+            high += 1
+            total += above
+        else:
+            low -= 1
+            total += below
+    return low, high
+
+def window_profile(profile, start=None, end=None):
+    # Everything the viewers draw for one window: volume per level, point of control and value area
+    volumes = volume_at_price(profile, start, end)
+    poc = point_of_control(volumes)
+    in_value_area = np.zeros(len(volumes), dtype=bool)
+    area = value_area(volumes)
+    if area is not None:
+        in_value_area[area[0]:area[1] + 1] = True
+    return {
+        'level_prices': profile['level_prices'],
+        'volumes': volumes,
+        'point_of_control': poc,
+        'in_value_area': in_value_area,
+    }
+
+def level_colors(window, color='lightgray', value_area_color='steelblue', poc_color='gold'):
+    colors = np.where(window['in_value_area'], value_area_color, color).astype(object)
+    if window['point_of_control'] is not None:
+        colors[window['point_of_control']] = poc_color
+    return colors